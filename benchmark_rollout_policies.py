@@ -0,0 +1,157 @@
+"""
+Benchmark for the Monte Carlo rollout policies
+Reports how often mc_move picks an optimal move for increasing trial counts
+until each policy and scoring rule holds the target accuracy, along with the
+cost of a single trial
+"""
+import time
+
+from tic_tac_toe import (DRAW, EMPTY, PLAYERO, PLAYERX, TTTBoard, mc_move,
+                         mc_run_trials, random_policy, tactical_policy)
+
+# Constants for the benchmark
+TRIAL_COUNTS = [5, 10, 25, 50, 100, 250, 500, 1000]
+SAMPLES = 200           # Number of calls to mc_move per trial count
+TARGET_ACCURACY = 0.9   # Fraction of optimal moves required
+TIMING_TRIALS = 5000    # Number of trials used to time each policy
+
+# Policies to compare as name: (policy, score_root_only)
+POLICIES = {'random/all': (random_policy, False),
+            'random/root': (random_policy, True),
+            'tactical/all': (tactical_policy, False),
+            'tactical/root': (tactical_policy, True)}
+
+# Positions to test as (name, rows, reverse, player to move)
+POSITIONS = [
+    ('win', ['XX ', 'OO ', '   '], False, PLAYERX),
+    ('block', ['XX ', ' O ', '   '], False, PLAYERO),
+    ('fork', ['X  ', ' O ', '  X'], False, PLAYERO),
+    ('reverse', ['X  ', ' O ', '   '], True, PLAYERX),
+    ('reverse2', ['XX ', ' O ', '   '], True, PLAYERO),
+    ('reverse3', ['XX ', 'O  ', '   '], True, PLAYERO),
+]
+
+
+def other_player(player):
+    """
+    Returns the opponent of player
+    """
+    if player == PLAYERX:
+        return PLAYERO
+    return PLAYERX
+
+
+def minimax(board, player):
+    """
+    Returns the game theoretic value of board for player to move
+    1 for a win, 0 for a draw and -1 for a loss
+    """
+    best = -1
+    for pos in board.get_empty_squares():
+        clone = board.get_board()
+        clone.move(pos[0], pos[1], player)
+        result = clone.check_win(pos[0], pos[1], player)
+        if result == player:
+            return 1
+        elif result == DRAW:
+            value = 0
+        elif result is not None:
+            value = -1
+        else:
+            value = -minimax(clone, other_player(player))
+        best = max(best, value)
+    return best
+
+
+def optimal_moves(board, player):
+    """
+    Returns the list of moves that keep the best game theoretic value
+    """
+    values = {}
+    for pos in board.get_empty_squares():
+        clone = board.get_board()
+        clone.move(pos[0], pos[1], player)
+        result = clone.check_win(pos[0], pos[1], player)
+        if result == player:
+            values[pos] = 1
+        elif result == DRAW:
+            values[pos] = 0
+        elif result is not None:
+            values[pos] = -1
+        else:
+            values[pos] = -minimax(clone, other_player(player))
+    best = max(values.values())
+    return [pos for pos, value in values.items() if value == best]
+
+
+def make_board(rows, reverse):
+    """
+    Builds a TTTBoard from a list of row strings
+    """
+    grid = [[EMPTY if char == ' ' else char for char in row] for row in rows]
+    return TTTBoard(len(rows), reverse, grid)
+
+
+def trials_needed(board, player, correct, policy, score_root_only, name):
+    """
+    Returns the fewest trials at which mc_move reaches the target accuracy
+    and still holds it at the next trial count, or None if it never does
+    """
+    previous = None
+    for trials in TRIAL_COUNTS:
+        hits = sum(mc_move(board, player, trials, policy, None, score_root_only)
+                   in correct for dummy_sample in range(SAMPLES))
+        accuracy = hits / SAMPLES
+        print(f"  {name:>13} {trials:>5} trials: {accuracy:6.1%}")
+        if accuracy < TARGET_ACCURACY:
+            previous = None
+        elif previous is not None:
+            return previous
+        else:
+            previous = trials
+    return previous
+
+
+def time_trials(policy, reverse):
+    """
+    Returns the average time in seconds of one trial from an empty board
+    """
+    board = TTTBoard(3, reverse)
+    scores = [0] * 9
+    start = time.perf_counter()
+    mc_run_trials(board, PLAYERX, TIMING_TRIALS, scores, policy)
+    return (time.perf_counter() - start) / TIMING_TRIALS
+
+
+def main():
+    """
+    Run the benchmark
+    """
+    needed = {name: {} for name in POLICIES}
+    for pos_name, rows, reverse, player in POSITIONS:
+        board = make_board(rows, reverse)
+        correct = optimal_moves(board, player)
+        print(f"Position '{pos_name}' ({player} to move), optimal moves: {correct}")
+        print(board)
+        for name, (policy, score_root_only) in POLICIES.items():
+            needed[name][pos_name] = trials_needed(board, player, correct, policy,
+                                                   score_root_only, name)
+        print()
+
+    print(f"Trials needed to reach and hold {TARGET_ACCURACY:.0%} accuracy")
+    for name in POLICIES:
+        for pos_name, dummy_rows, dummy_reverse, dummy_player in POSITIONS:
+            trials = needed[name][pos_name]
+            if trials is None:
+                trials = f'>{TRIAL_COUNTS[-1]}'
+            print(f"  {name:>13} {pos_name:>8}: {trials}")
+
+    print("Cost of one trial from an empty board")
+    for name, policy in (('random', random_policy), ('tactical', tactical_policy)):
+        for mode, reverse in (('regular', False), ('reverse', True)):
+            cost = time_trials(policy, reverse)
+            print(f"  {name:>13} {mode:>8}: {cost * 1e6:.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,14 @@
 """
 Test suite for Tic-Tac-Toe
 """
+import time
 import unittest
+from unittest import mock
 
-from tic_tac_toe import DRAW, EMPTY, PLAYERO, PLAYERX, TTTBoard
+import tic_tac_toe
+from tic_tac_toe import (DRAW, EMPTY, PLAYERO, PLAYERX, Ponderer, TTTBoard,
+                         get_best_move, mc_move, mc_run_trials, mc_trial,
+                         mc_update_scores, random_policy, tactical_policy)
 
 
 class TestTTT(unittest.TestCase):
@@ -312,6 +317,236 @@ class TestTTT(unittest.TestCase):
             for col in range(self.game._dim):
                 self.assertEqual(self.game.check_win(row, col, PLAYERX), DRAW)
 
+    def test_get_completing_squares(self):
+        """
+        Ensure that get_completing_squares returns only open squares that
+        complete a line for the given player
+        """
+        self.assertEqual(self.game.get_completing_squares(PLAYERX), [])
+
+        self.game.move(0, 0, PLAYERX)
+        self.game.move(0, 1, PLAYERX)
+        self.game.move(1, 1, PLAYERX)
+        self.assertEqual(sorted(self.game.get_completing_squares(PLAYERX)),
+                         [(0, 2), (2, 1), (2, 2)])
+        self.assertEqual(self.game.get_completing_squares(PLAYERO), [])
+
+        # Blocked lines are no longer threats
+        self.game.move(2, 2, PLAYERO)
+        self.assertEqual(sorted(self.game.get_completing_squares(PLAYERX)),
+                         [(0, 2), (2, 1)])
+
+        # Line counts are rebuilt for boards passed to the constructor
+        board = TTTBoard(3, board=[[PLAYERO, EMPTY, EMPTY],
+                                   [PLAYERO, EMPTY, EMPTY],
+                                   [EMPTY, EMPTY, EMPTY]])
+        self.assertEqual(board.get_completing_squares(PLAYERO), [(2, 0)])
+
+    def test_tactical_policy(self):
+        """
+        Ensure that tactical_policy wins, then blocks, then plays randomly
+        """
+        self.game.move(0, 0, PLAYERX)
+        self.game.move(0, 1, PLAYERX)
+        self.game.move(1, 0, PLAYERO)
+        self.game.move(1, 1, PLAYERO)
+        self.assertEqual(tactical_policy(self.game, PLAYERX), (0, 2))
+        self.assertEqual(tactical_policy(self.game, PLAYERO), (1, 2))
+
+        self.game.move(1, 2, PLAYERX)
+        self.assertEqual(tactical_policy(self.game, PLAYERO), (0, 2))
+
+        self.game.move(0, 2, PLAYERO)
+        self.assertEqual(tactical_policy(self.game, PLAYERX), (2, 0))
+
+        # With no threats on the board any empty square may be chosen
+        self.game.move(2, 0, PLAYERX)
+        for dummy_trial in range(20):
+            self.assertIn(tactical_policy(self.game, PLAYERO),
+                          [(2, 1), (2, 2)])
+
+        # In reverse mode own completing squares are avoided
+        board = TTTBoard(3, True)
+        board.move(0, 0, PLAYERX)
+        board.move(0, 1, PLAYERX)
+        for dummy_trial in range(20):
+            self.assertNotEqual(tactical_policy(board, PLAYERX), (0, 2))
+
+    def test_mc_trial(self):
+        """
+        Ensure that mc_trial plays a game to completion with either policy
+        """
+        for policy in (random_policy, tactical_policy):
+            for reverse in (False, True):
+                board = TTTBoard(3, reverse)
+                winner = mc_trial(board, PLAYERX, policy)
+                self.assertIn(winner, (PLAYERX, PLAYERO, DRAW))
+                if winner == DRAW:
+                    self.assertEqual(board.get_empty_squares(), [])
+
+        # After the first random move O always takes the open square to win
+        for dummy_trial in range(20):
+            board = TTTBoard(3, board=[[PLAYERX, EMPTY, EMPTY],
+                                       [PLAYERO, PLAYERO, EMPTY],
+                                       [PLAYERX, EMPTY, PLAYERX]])
+            if mc_trial(board, PLAYERX, tactical_policy) != PLAYERX:
+                self.assertEqual(board.get_square(1, 2), PLAYERO)
+
+    def test_mc_update_scores(self):
+        """
+        Ensure that scoring from the move list matches scoring every square
+        of the finished board for all squares that were empty before the trial
+        """
+        def grid_scores(scores, board, player, winner):
+            if winner == DRAW:
+                return
+            if winner == player:
+                winner_increment = tic_tac_toe.SCORE_COMP
+                loser_decrement = tic_tac_toe.SCORE_OTHER
+            else:
+                winner_increment = tic_tac_toe.SCORE_OTHER
+                loser_decrement = tic_tac_toe.SCORE_COMP
+            for row in range(board.get_dim()):
+                for col in range(board.get_dim()):
+                    if board.get_square(row, col) == winner:
+                        scores[row][col] += winner_increment
+                    elif board.get_square(row, col) != EMPTY:
+                        scores[row][col] -= loser_decrement
+
+        self.game.move(1, 1, PLAYERX)
+        self.game.move(0, 0, PLAYERO)
+        empty_squares = self.game.get_empty_squares()
+        dim = self.game.get_dim()
+        for score_comp, score_other in ((1.0, 1.0), (2.0, 0.5)):
+            with mock.patch.multiple(tic_tac_toe, SCORE_COMP=score_comp,
+                                     SCORE_OTHER=score_other):
+                for player in (PLAYERX, PLAYERO):
+                    expected = [[0] * dim for dummy_row in range(dim)]
+                    scores = [0] * (dim * dim)
+                    moves = []
+                    for dummy_trial in range(200):
+                        clone = self.game.get_board()
+                        moves.clear()
+                        winner = mc_trial(clone, player, random_policy, moves)
+                        self.assertEqual(len(moves), len(empty_squares) -
+                                         len(clone.get_empty_squares()))
+                        grid_scores(expected, clone, player, winner)
+                        mc_update_scores(scores, moves, dim, player, winner)
+                    for row, col in empty_squares:
+                        self.assertEqual(scores[row * dim + col], expected[row][col])
+
+    def test_mc_run_trials(self):
+        """
+        Ensure that scoring only the root move ranks a win in one above the
+        square the other player would win with, whatever the policy
+        """
+        self.game.move(0, 0, PLAYERX)
+        self.game.move(0, 1, PLAYERX)
+        self.game.move(1, 0, PLAYERO)
+        self.game.move(1, 1, PLAYERO)
+        for policy in (random_policy, tactical_policy):
+            scores = [0] * 9
+            self.assertEqual(mc_run_trials(self.game, PLAYERX, 200, scores,
+                                           policy, None, True), 200)
+            best = max(self.game.get_empty_squares(),
+                       key=lambda pos: scores[pos[0] * 3 + pos[1]])
+            self.assertEqual(best, (0, 2))
+            self.assertGreater(scores[2], 0)
+
+    def test_get_empty_orbits(self):
+        """
+        Ensure that empty squares are grouped by the symmetries of the board
+        """
+        self.assertEqual(len(self.game.get_symmetries()), 8)
+        self.assertEqual(self.game.get_empty_orbits(), [
+            [(0, 0), (0, 2), (2, 0), (2, 2)], [(0, 1), (1, 0), (1, 2), (2, 1)], [(1, 1)]])
+
+        self.game.move(1, 1, PLAYERX)
+        self.assertEqual(len(self.game.get_symmetries()), 8)
+        self.assertEqual(self.game.get_empty_orbits(), [
+            [(0, 0), (0, 2), (2, 0), (2, 2)], [(0, 1), (1, 0), (1, 2), (2, 1)]])
+
+        self.game.move(0, 0, PLAYERO)
+        self.assertEqual(len(self.game.get_symmetries()), 2)
+        self.assertEqual(self.game.get_empty_orbits(), [
+            [(0, 1), (1, 0)], [(0, 2), (2, 0)], [(1, 2), (2, 1)], [(2, 2)]])
+
+        self.game.move(0, 1, PLAYERX)
+        self.assertEqual(len(self.game.get_symmetries()), 1)
+        self.assertEqual(self.game.get_empty_orbits(),
+                         [[pos] for pos in self.game.get_empty_squares()])
+
+    def test_get_best_move(self):
+        """
+        Ensure that get_best_move compares orbits by their average score
+        """
+        scores = [1, 0, 1,
+                  0, 3, 0,
+                  1, 0, 5]
+        self.assertEqual(get_best_move(self.game, scores), (2, 2))
+
+        orbits = self.game.get_empty_orbits()
+        self.assertEqual(get_best_move(self.game, scores, orbits), (1, 1))
+
+        scores[4] = 1
+        for dummy_trial in range(20):
+            self.assertIn(get_best_move(self.game, scores, orbits),
+                          [(0, 0), (0, 2), (2, 0), (2, 2)])
+
+    def test_ponderer(self):
+        """
+        Ensure that the ponderer keeps the statistics for the reply played,
+        discards the rest, and that mc_move only runs the trials still needed
+        """
+        self.game.move(0, 0, PLAYERX)
+        self.game.move(1, 0, PLAYERO)
+        self.game.move(0, 1, PLAYERX)
+        ponderer = Ponderer(self.game, PLAYERX, 50)
+        ponderer.start()
+        ponderer.wait()
+        scores, trials_run = ponderer.stop((1, 1))
+        self.assertEqual(trials_run, 50)
+        self.assertEqual(len(scores), 9)
+
+        # Statistics for other replies are discarded
+        self.assertIsNone(ponderer.stop((2, 2)))
+
+        # Only squares still empty after the reply were played in the trials
+        self.game.move(1, 1, PLAYERO)
+        empty_squares = self.game.get_empty_squares()
+        for row in range(3):
+            for col in range(3):
+                if (row, col) not in empty_squares:
+                    self.assertEqual(scores[row * 3 + col], 0)
+        self.assertTrue(any(scores[row * 3 + col] != 0
+                            for row, col in empty_squares))
+
+        with mock.patch('tic_tac_toe.mc_trial', wraps=mc_trial) as trial:
+            self.assertIn(mc_move(self.game, PLAYERX, 50, random_policy,
+                                  (scores, trials_run)), empty_squares)
+            self.assertEqual(trial.call_count, 0)
+            mc_move(self.game, PLAYERX, 20, random_policy, ([0] * 9, 5))
+            self.assertEqual(trial.call_count, 15)
+
+        # Replies that end the game aren't searched
+        board = TTTBoard(3, board=[[PLAYERX, PLAYERX, EMPTY],
+                                   [PLAYERO, PLAYERO, EMPTY],
+                                   [PLAYERX, EMPTY, EMPTY]])
+        ponderer = Ponderer(board, PLAYERX, 10)
+        ponderer.start()
+        ponderer.wait()
+        self.assertIsNone(ponderer.stop((1, 2)))
+
+        # Stopping early keeps partial statistics
+        ponderer = Ponderer(TTTBoard(3), PLAYERO, 100000)
+        ponderer.start()
+        while ponderer.get_trials_run((0, 0)) < 50:
+            time.sleep(0.001)
+        scores, trials_run = ponderer.stop((0, 0))
+        self.assertTrue(0 < trials_run < 100000)
+        self.assertTrue(any(scores))
+        self.assertIsNone(ponderer.stop((0, 0)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,9 +3,9 @@ Implementation of Tic-Tac-Toe
 Allows for reverse Tic-Tac-Toe in which getting three squares
 in a row results in a loss
 """
-from copy import deepcopy
 from random import choice
 import sys
+import threading
 
 import pygame as pg
 
@@ -46,6 +46,14 @@ OFFSETS = {RIGHT: (0, 1),
 NTRIALS = 2500         # Number of trials to run
 SCORE_COMP = 1.0  # Score for squares played by the current player
 SCORE_OTHER = 1.0   # Score for squares played by the other player
+PONDER = False     # Search the human's possible replies during their turn
+
+# Rollout policy for each game mode and whether only the first move of each
+# trial is scored, see ROLLOUT_POLICIES for the policy names
+ROLLOUT_POLICY = 'tactical'
+ROLLOUT_SCORE_ROOT_ONLY = True
+REVERSE_ROLLOUT_POLICY = 'random'
+REVERSE_ROLLOUT_SCORE_ROOT_ONLY = False
 
 
 class TTTBoard:
@@ -65,6 +73,16 @@ class TTTBoard:
         else:
             self._board = [[EMPTY for row in range(dim)] for col in range(dim)]
 
+        # Number of markers each player has in every line (rows, then columns,
+        # then the two diagonals) so threats can be found without a rescan
+        self._line_counts = {PLAYERX: [0] * (2 * dim + 2),
+                             PLAYERO: [0] * (2 * dim + 2)}
+        for row in range(dim):
+            for col in range(dim):
+                if self._board[row][col] in self._line_counts:
+                    for line in self._get_lines(row, col):
+                        self._line_counts[self._board[row][col]][line] += 1
+
     def __str__(self):
         """
         Returns string representation of the board
@@ -88,12 +106,42 @@ class TTTBoard:
                 return_string = f"{return_string}\n---------\n"
         return return_string
 
+    def _get_lines(self, row, col):
+        """
+        Returns the indices of the lines that pass through (row, col)
+        """
+        lines = [row, self._dim + col]
+        if row == col:
+            lines.append(2 * self._dim)
+        if row + col == self._dim - 1:
+            lines.append(2 * self._dim + 1)
+        return lines
+
+    def _get_line_squares(self, line):
+        """
+        Returns a list of (row, col) tuples for the squares in a line
+        """
+        if line < self._dim:
+            return [(line, col) for col in range(self._dim)]
+        elif line < 2 * self._dim:
+            return [(row, line - self._dim) for row in range(self._dim)]
+        elif line == 2 * self._dim:
+            return [(idx, idx) for idx in range(self._dim)]
+        else:
+            return [(idx, self._dim - 1 - idx) for idx in range(self._dim)]
+
     def get_dim(self):
         """
         Returns the dimensions of the board
         """
         return self._dim
 
+    def is_reverse(self):
+        """
+        Returns whether the game is set to reverse
+        """
+        return self._reverse
+
     def get_square(self, row, col):
         """
         Returns the contents of a square on the board
@@ -108,11 +156,82 @@ class TTTBoard:
             self._dim) if self.get_square(row, col) == EMPTY]
         return return_list
 
+    def get_completing_squares(self, player):
+        """
+        Returns a list of (row, col) tuples for empty squares that would
+        complete a line for player (a win, or a loss in reverse mode)
+        """
+        other = PLAYERO if player == PLAYERX else PLAYERX
+        counts = self._line_counts[player]
+        other_counts = self._line_counts[other]
+        seen = set()
+        return_list = []
+        for line, count in enumerate(counts):
+            if count == self._dim - 1 and other_counts[line] == 0:
+                for pos in self._get_line_squares(line):
+                    if self._board[pos[0]][pos[1]] == EMPTY and pos not in seen:
+                        seen.add(pos)
+                        return_list.append(pos)
+        return return_list
+
+    def get_symmetries(self):
+        """
+        Returns a list of the rotations and reflections that leave the board
+        unchanged, each as a function mapping (row, col) to (row, col)
+        """
+        last = self._dim - 1
+        transforms = [lambda row, col: (row, col),
+                      lambda row, col: (col, last - row),
+                      lambda row, col: (last - row, last - col),
+                      lambda row, col: (last - col, row),
+                      lambda row, col: (row, last - col),
+                      lambda row, col: (last - row, col),
+                      lambda row, col: (col, row),
+                      lambda row, col: (last - col, last - row)]
+        squares = [(row, col) for row in range(self._dim) for col in range(self._dim)]
+        return_list = []
+        for transform in transforms:
+            # Stop checking a transform at the first square it doesn't preserve
+            if all(self._board[row][col] == self.get_square(*transform(row, col))
+                   for row, col in squares):
+                return_list.append(transform)
+        return return_list
+
+    def get_empty_orbits(self):
+        """
+        Groups the empty squares into orbits of squares that are equivalent
+        under the board's symmetries
+        Returns a list of lists of (row, col) tuples
+        """
+        symmetries = self.get_symmetries()
+        seen = set()
+        return_list = []
+        for pos in self.get_empty_squares():
+            if pos not in seen:
+                orbit = sorted({transform(pos[0], pos[1]) for transform in symmetries})
+                seen.update(orbit)
+                return_list.append(orbit)
+        return return_list
+
     def get_board(self):
         """
         Returns a copy of the board
+        Copies the rows and line counts directly, since a generic deepcopy
+        dominates the cost of a Monte Carlo trial
+        """
+        clone = TTTBoard.__new__(TTTBoard)
+        clone._dim = self._dim
+        clone._reverse = self._reverse
+        clone._board = [row[:] for row in self._board]
+        clone._line_counts = {player: counts[:]
+                              for player, counts in self._line_counts.items()}
+        return clone
+
+    def __deepcopy__(self, memo):
         """
-        return deepcopy(self)
+        Returns a copy of the board, see get_board
+        """
+        return self.get_board()
 
     def move(self, row, col, player):
         """
@@ -123,6 +242,8 @@ class TTTBoard:
         """
         if self._board[row][col] == EMPTY:
             self._board[row][col] = player
+            for line in self._get_lines(row, col):
+                self._line_counts[player][line] += 1
             return (row, col)
 
     def check_win(self, row, col, player):
@@ -159,9 +280,54 @@ class TTTBoard:
             return DRAW
 
 
-def mc_trial(board, player):
+def random_policy(board, player):
+    """
+    Rollout policy that selects a random empty square
+    """
+    return choice(board.get_empty_squares())
+
+
+def tactical_policy(board, player):
+    """
+    Rollout policy that wins if possible, else blocks, else plays randomly
+
+    In reverse mode completing a line loses, so it avoids its own completing
+    squares and leaves the other player's completing squares open
+    """
+    other = PLAYERO if player == PLAYERX else PLAYERX
+    own = board.get_completing_squares(player)
+    if not board.is_reverse():
+        if own:
+            return choice(own)
+        threats = board.get_completing_squares(other)
+        if threats:
+            return choice(threats)
+        return random_policy(board, player)
+
+    # Completing squares come from the line counts, so only the random choice
+    # needs the empty squares
+    empty_squares = board.get_empty_squares()
+    if not own:
+        safe_squares = empty_squares
+    else:
+        own = set(own)
+        safe_squares = [pos for pos in empty_squares if pos not in own]
+        if not safe_squares:
+            return choice(empty_squares)
+    threats = set(board.get_completing_squares(other))
+    if not threats:
+        return choice(safe_squares)
+    best_squares = [pos for pos in safe_squares if pos not in threats]
+    if best_squares:
+        return choice(best_squares)
+    return choice(safe_squares)
+
+
+def mc_trial(board, player, policy=random_policy, moves=None):
     """
     Plays a game of Tic-Tac-Toe using the current board state as the starting point
+    Moves after the first are selected by policy(board, player)
+    If moves is a list, each move played is appended to it as (row, col, player)
     Returns the winner
     """
     comp = player
@@ -172,23 +338,30 @@ def mc_trial(board, player):
         other = PLAYERX
 
     trial_winner = None
+    # The first move is always random so that every candidate square gets
+    # sampled, otherwise a deterministic policy would only ever try one
+    move_policy = random_policy
     in_progress = True
     while in_progress:
-        # Alternate between each player, selecting a random move, check for win/draw
+        # Alternate between each player, selecting a move, check for win/draw
         for idx in [comp, other]:
-            idx_move = choice(board.get_empty_squares())
+            idx_move = move_policy(board, idx)
+            move_policy = policy
             board.move(idx_move[0], idx_move[1], idx)
-            if board.check_win(idx_move[0], idx_move[1], idx) is not None:
-                trial_winner = board.check_win(idx_move[0], idx_move[1], idx)
+            if moves is not None:
+                moves.append((idx_move[0], idx_move[1], idx))
+            trial_winner = board.check_win(idx_move[0], idx_move[1], idx)
+            if trial_winner is not None:
                 in_progress = False
                 break
     return trial_winner
 
 
-def mc_update_scores(scores, board, player, winner):
+def mc_update_scores(scores, moves, dim, player, winner):
     """
-    Takes a grid of scores with the same dimensions as the Tic-Tac-Toe board, the
-    computer player, and the winner of a trial. Updates scores for each position.
+    Takes a flat list of scores indexed by row * dim + col, the moves played
+    in a trial as (row, col, player) tuples, the computer player, and the
+    winner of the trial. Updates scores for each position that was played.
 
     Positions of the winning player have their scores increased whereas positions
     of the losing player have their scores decreases.
@@ -209,43 +382,175 @@ def mc_update_scores(scores, board, player, winner):
         winner_increment = SCORE_OTHER
         loser_decrement = SCORE_COMP
 
-    for row in range(board.get_dim()):
-        for col in range(board.get_dim()):
-            if board.get_square(row, col) == winner:
-                scores[row][col] += winner_increment
-            elif board.get_square(row, col) != (winner and EMPTY):
-                scores[row][col] -= loser_decrement
+    for row, col, mover in moves:
+        if mover == winner:
+            scores[row * dim + col] += winner_increment
+        else:
+            scores[row * dim + col] -= loser_decrement
 
 
-def get_best_move(board, scores):
+def get_best_move(board, scores, orbits=None):
     """
-    Determines the best move given the current board and scoring from the Monte Carlo trials
+    Determines the best move given the current board and the flat list of
+    scores from the Monte Carlo trials
+
+    If orbits of equivalent squares are given, their scores are pooled and
+    each orbit is compared using its average score
     """
-    # Determine the highest scoring empty square
-    max_score = 0
-    for pos in board.get_empty_squares():
-        if scores[pos[0]][pos[1]] > max_score:
-            max_score = scores[pos[0]][pos[1]]
+    dim = board.get_dim()
+    if orbits is None:
+        orbits = [[pos] for pos in board.get_empty_squares()]
 
-    # Make a list of empty squares that have the max_score
-    best_empty_squares = [pos for pos in board.get_empty_squares(
-    ) if scores[pos[0]][pos[1]] == max_score]
+    orbit_scores = [sum(scores[row * dim + col] for row, col in orbit) / len(orbit)
+                    for orbit in orbits]
+
+    # Determine the highest scoring orbit
+    max_score = max(orbit_scores)
+
+    # Make a list of empty squares in orbits that have the max_score
+    best_empty_squares = [pos for orbit, score in zip(orbits, orbit_scores)
+                          if score == max_score for pos in orbit]
 
     return choice(best_empty_squares)
 
 
-def mc_move(board, player, trials):
+def mc_run_trials(board, player, trials, scores, policy=random_policy, stop=None,
+                  score_root_only=False):
     """
-    Determines the best move based on repeated simulations
+    Runs up to the given number of trials from board, adding the results to
+    the flat list of scores
+    Stops early if the stop event is set
+    Returns the number of trials run
+
+    By default every move played is scored. With score_root_only only the
+    first move of each trial is scored, which suits policies that answer
+    threats, since the winner's other squares are then mostly forced replies
     """
-    scores = [[0 for row in range(board.get_dim())]
-              for col in range(board.get_dim())]
-    while trials > 0:
+    dim = board.get_dim()
+    moves = []
+    trials_run = 0
+    while trials_run < trials and not (stop is not None and stop.is_set()):
         clone = board.get_board()
-        winner = mc_trial(clone, player)
-        mc_update_scores(scores, clone, player, winner)
-        trials -= 1
-    return get_best_move(board, scores)
+        moves.clear()
+        winner = mc_trial(clone, player, policy, moves)
+        if score_root_only:
+            mc_update_scores(scores, moves[:1], dim, player, winner)
+        else:
+            mc_update_scores(scores, moves, dim, player, winner)
+        trials_run += 1
+    return trials_run
+
+
+def mc_move(board, player, trials, policy=random_policy, pondered=None,
+            score_root_only=False):
+    """
+    Determines the best move based on repeated simulations
+    Statistics are pooled across squares made equivalent by the board's symmetry
+
+    pondered is an optional (scores, trials run) pair from earlier trials on
+    this same board, in which case only the remaining trials are run
+    score_root_only is passed on to mc_run_trials
+    """
+    dim = board.get_dim()
+    scores = [0] * (dim * dim)
+    if pondered is not None:
+        scores, trials_run = pondered
+        trials -= trials_run
+    mc_run_trials(board, player, trials, scores, policy, None, score_root_only)
+    return get_best_move(board, scores, board.get_empty_orbits())
+
+
+class Ponderer:
+    """
+    Runs Monte Carlo trials for each of the human's possible replies in a
+    background thread while waiting for the human to move
+    """
+
+    def __init__(self, board, comp, trials, policy=random_policy, score_root_only=False):
+        """
+        Prepare a copy of the board for every reply by the other player
+        that doesn't end the game
+        """
+        self._comp = comp
+        self._trials = trials
+        self._policy = policy
+        self._score_root_only = score_root_only
+        other = PLAYERO if comp == PLAYERX else PLAYERX
+        dim = board.get_dim()
+        self._replies = {}
+        for row, col in board.get_empty_squares():
+            reply = board.get_board()
+            reply.move(row, col, other)
+            if reply.check_win(row, col, other) is None:
+                self._replies[(row, col)] = [reply, [0] * (dim * dim), 0]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        """
+        Spreads trials evenly over the replies, in small batches so that every
+        reply has partial statistics when the human moves
+        """
+        batch = max(1, self._trials // 10)
+        while not self._stop.is_set():
+            pending = [stats for stats in self._replies.values()
+                       if stats[2] < self._trials]
+            if not pending:
+                return
+            for stats in pending:
+                stats[2] += mc_run_trials(
+                    stats[0], self._comp, min(batch, self._trials - stats[2]),
+                    stats[1], self._policy, self._stop, self._score_root_only)
+
+    def start(self):
+        """
+        Start searching in the background
+        """
+        self._thread.start()
+
+    def wait(self):
+        """
+        Block until every reply has had the full number of trials run
+        Only used by tests, main() never calls it
+        """
+        self._thread.join()
+
+    def get_trials_run(self, move):
+        """
+        Returns the number of trials run so far for the reply move
+        """
+        stats = self._replies.get(move)
+        if stats is None:
+            return 0
+        return stats[2]
+
+    def stop(self, move):
+        """
+        Stop searching and discard the statistics for every reply except move
+        Returns a (scores, trials run) pair for move, or None if there is none
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        stats = self._replies.get(move)
+        self._replies = {}
+        if stats is None:
+            return None
+        return stats[1], stats[2]
+
+
+# Rollout policies that can be named in the rollout settings
+ROLLOUT_POLICIES = {'random': random_policy, 'tactical': tactical_policy}
+
+
+def get_rollout_settings(reverse):
+    """
+    Returns the rollout policy and whether only the root move is scored
+    for the given game mode
+    """
+    if reverse:
+        return ROLLOUT_POLICIES[REVERSE_ROLLOUT_POLICY], REVERSE_ROLLOUT_SCORE_ROOT_ONLY
+    return ROLLOUT_POLICIES[ROLLOUT_POLICY], ROLLOUT_SCORE_ROOT_ONLY
 
 
 def draw(screen, board, board_image, board_rects, button_rects, text, winner):
@@ -357,11 +662,15 @@ def main():
     reverse = False
     comp = PLAYERX
     player = PLAYERO
+    ponderer = None
+    pondered = None
 
     # Main game logic
     while True:
         for event in pg.event.get():
             if event.type == pg.QUIT:
+                if ponderer is not None:
+                    ponderer.stop(None)
                 pg.quit()
                 sys.exit()
             elif event.type == pg.MOUSEBUTTONUP:
@@ -390,19 +699,31 @@ def main():
         draw(screen, board, board_image, board_rects, button_rects, texts, winner)
 
         if not player_turn and not winner:
-            comp_move = mc_move(board, comp, NTRIALS)
+            policy, score_root_only = get_rollout_settings(board.is_reverse())
+            comp_move = mc_move(board, comp, NTRIALS, policy, pondered,
+                                score_root_only)
+            pondered = None
             board.move(comp_move[0], comp_move[1], comp)
             result = board.check_win(comp_move[0], comp_move[1], comp)
             if result is not None:
                 winner = result
             else:
                 player_turn = True
+                # Search the human's possible replies while waiting for them
+                if PONDER:
+                    ponderer = Ponderer(board, comp, NTRIALS, policy,
+                                        score_root_only)
+                    ponderer.start()
         elif player_move and not winner:
             # Only update if the call to move returns a result
             # this prevents clicking on a filled space from counting as a move
             if board.move(player_move[0], player_move[1], player):
                 result = board.check_win(
                     player_move[0], player_move[1], player)
+                # Keep only the search results for the move the human made
+                if ponderer is not None:
+                    pondered = ponderer.stop(player_move)
+                    ponderer = None
                 player_move = None
                 player_turn = False
                 if result is not None: